@@ -15,29 +15,69 @@
 -- Main Tables
 -- ============================================================================
 
+-- Enumerated types for the fixed-value task columns
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'kanban_status') THEN
+        CREATE TYPE kanban_status AS ENUM ('pending', 'completed');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'kanban_priority') THEN
+        CREATE TYPE kanban_priority AS ENUM ('high', 'medium', 'low');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'kanban_owner') THEN
+        CREATE TYPE kanban_owner AS ENUM ('user', 'agent');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'kanban_section') THEN
+        CREATE TYPE kanban_section AS ENUM ('Backlog', 'To Do', 'In Progress', 'Completed');
+    END IF;
+END
+$$;
+
 -- Kanban tasks table
 CREATE TABLE IF NOT EXISTS kanban_tasks (
     id SERIAL PRIMARY KEY,
     content TEXT NOT NULL,
-    status VARCHAR(20) NOT NULL DEFAULT 'pending',
-    priority VARCHAR(10) DEFAULT 'medium',
-    owner VARCHAR(20) DEFAULT 'agent',
-    section VARCHAR(50) NOT NULL DEFAULT 'Backlog',
+    status kanban_status NOT NULL DEFAULT 'pending',
+    priority kanban_priority DEFAULT 'medium',
+    owner kanban_owner DEFAULT 'agent',
+    section kanban_section NOT NULL DEFAULT 'Backlog',
     epic VARCHAR(100),
     area VARCHAR(50) DEFAULT 'general',
     occurrence_count INTEGER DEFAULT 1,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP WITH TIME ZONE,
-    position INTEGER DEFAULT 0,
-    
-    -- Constraints
-    CONSTRAINT valid_status CHECK (status IN ('pending', 'completed')),
-    CONSTRAINT valid_priority CHECK (priority IN ('high', 'medium', 'low')),
-    CONSTRAINT valid_section CHECK (section IN ('Backlog', 'To Do', 'In Progress', 'Completed')),
-    CONSTRAINT valid_owner CHECK (owner IN ('user', 'agent'))
+    position INTEGER DEFAULT 0
 );
 
+-- Upgrade tables created with the earlier VARCHAR + CHECK constraint columns
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'kanban_tasks' AND column_name = 'status') = 'character varying' THEN
+        ALTER TABLE kanban_tasks
+            DROP CONSTRAINT IF EXISTS valid_status,
+            DROP CONSTRAINT IF EXISTS valid_priority,
+            DROP CONSTRAINT IF EXISTS valid_section,
+            DROP CONSTRAINT IF EXISTS valid_owner,
+            ALTER COLUMN status DROP DEFAULT,
+            ALTER COLUMN priority DROP DEFAULT,
+            ALTER COLUMN owner DROP DEFAULT,
+            ALTER COLUMN section DROP DEFAULT;
+        ALTER TABLE kanban_tasks
+            ALTER COLUMN status TYPE kanban_status USING status::kanban_status,
+            ALTER COLUMN priority TYPE kanban_priority USING priority::kanban_priority,
+            ALTER COLUMN owner TYPE kanban_owner USING owner::kanban_owner,
+            ALTER COLUMN section TYPE kanban_section USING section::kanban_section;
+        ALTER TABLE kanban_tasks
+            ALTER COLUMN status SET DEFAULT 'pending',
+            ALTER COLUMN priority SET DEFAULT 'medium',
+            ALTER COLUMN owner SET DEFAULT 'agent',
+            ALTER COLUMN section SET DEFAULT 'Backlog';
+    END IF;
+END
+$$;
+
 -- Task history/audit log table
 CREATE TABLE IF NOT EXISTS kanban_task_history (
     id SERIAL PRIMARY KEY,
@@ -68,12 +108,20 @@ CREATE TABLE IF NOT EXISTS kanban_task_tags (
 -- Indexes for Performance
 -- ============================================================================
 
-CREATE INDEX IF NOT EXISTS idx_kanban_section ON kanban_tasks(section);
-CREATE INDEX IF NOT EXISTS idx_kanban_status ON kanban_tasks(status);
-CREATE INDEX IF NOT EXISTS idx_kanban_priority ON kanban_tasks(priority);
+-- One composite for the list_tasks filters (replaces the single-column
+-- section/status/priority/epic indexes); Postgres 18 skip scan uses it even
+-- when the leading columns aren't filtered on
+DROP INDEX IF EXISTS idx_kanban_section;
+DROP INDEX IF EXISTS idx_kanban_status;
+DROP INDEX IF EXISTS idx_kanban_priority;
+DROP INDEX IF EXISTS idx_kanban_epic;
+CREATE INDEX IF NOT EXISTS idx_kanban_filters ON kanban_tasks(status, section, priority, epic);
 CREATE INDEX IF NOT EXISTS idx_kanban_created_at ON kanban_tasks(created_at DESC);
-CREATE INDEX IF NOT EXISTS idx_kanban_epic ON kanban_tasks(epic);
-CREATE INDEX IF NOT EXISTS idx_kanban_position ON kanban_tasks(section, position);
+-- Matches the list_tasks ORDER BY (section, position, created_at DESC);
+-- replaces the older idx_kanban_position (section, position)
+DROP INDEX IF EXISTS idx_kanban_position;
+CREATE INDEX IF NOT EXISTS idx_kanban_list ON kanban_tasks(section, position, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_kanban_section_priority ON kanban_tasks(section, priority);
 CREATE INDEX IF NOT EXISTS idx_history_task_id ON kanban_task_history(task_id);
 CREATE INDEX IF NOT EXISTS idx_history_changed_at ON kanban_task_history(changed_at DESC);
 
@@ -5,18 +5,60 @@ Replaces the TODO.md file-based approach with proper database storage.
 This file should be placed in: hosting-management-system/models/kanban.py
 """
 
+import enum
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, ForeignKey,
-    CheckConstraint, Index, func
+    Column, Integer, String, Text, DateTime, FetchedValue, ForeignKey,
+    Enum, Index, func, select, text
 )
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.orm import column_property, declarative_base, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
 Base = declarative_base()
 
 
+# ============================================================================
+# Enumerated Types
+# ============================================================================
+
+class Status(str, enum.Enum):
+    """Task completion status."""
+    PENDING = 'pending'
+    COMPLETED = 'completed'
+
+
+class Priority(str, enum.Enum):
+    """Task priority level."""
+    HIGH = 'high'
+    MEDIUM = 'medium'
+    LOW = 'low'
+
+
+class Owner(str, enum.Enum):
+    """Who is responsible for a task."""
+    USER = 'user'
+    AGENT = 'agent'
+
+
+class Section(str, enum.Enum):
+    """Kanban board column."""
+    BACKLOG = 'Backlog'
+    TODO = 'To Do'
+    IN_PROGRESS = 'In Progress'
+    COMPLETED = 'Completed'
+
+
+def _pg_enum(enum_class, name):
+    """Native PostgreSQL ENUM storing the member values ('To Do'), not the names ('TODO')."""
+    return Enum(
+        enum_class,
+        name=name,
+        native_enum=True,
+        values_callable=lambda members: [member.value for member in members]
+    )
+
+
 class KanbanTask(Base):
     """
     Main kanban task model.
@@ -29,10 +71,10 @@ class KanbanTask(Base):
     
     # Core fields
     content = Column(Text, nullable=False)
-    status = Column(String(20), nullable=False, default='pending')
-    priority = Column(String(10), default='medium')
-    owner = Column(String(20), default='agent')
-    section = Column(String(50), nullable=False, default='Backlog')
+    status = Column(_pg_enum(Status, 'kanban_status'), nullable=False, default=Status.PENDING)
+    priority = Column(_pg_enum(Priority, 'kanban_priority'), default=Priority.MEDIUM)
+    owner = Column(_pg_enum(Owner, 'kanban_owner'), default=Owner.AGENT)
+    section = Column(_pg_enum(Section, 'kanban_section'), nullable=False, default=Section.BACKLOG)
     
     # Classification
     epic = Column(String(100), nullable=True)
@@ -41,7 +83,9 @@ class KanbanTask(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), nullable=False)
+    # Maintained by the trigger_update_kanban_task_timestamp BEFORE UPDATE trigger
+    # (DATABASE_MIGRATION_KANBAN.sql), so raw UPDATEs keep it correct too
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), server_onupdate=FetchedValue(), nullable=False)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Position for drag-and-drop ordering
@@ -49,50 +93,32 @@ class KanbanTask(Base):
     
     # Relationships
     history = relationship("KanbanTaskHistory", back_populates="task", cascade="all, delete-orphan")
-    tags = relationship("KanbanTag", secondary="kanban_task_tags", back_populates="tasks")
+    # Tags are always serialized with the task (see TaskResponse), so load them for a
+    # whole result set in one "WHERE task_id IN (...)" query instead of one lazy
+    # SELECT per task. This also covers session.refresh() after a commit, where a
+    # lazy load is not allowed under AsyncSession.
+    tags = relationship("KanbanTag", secondary="kanban_task_tags", back_populates="tasks", lazy="selectin")
     
-    # Constraints
+    # Indexes (valid values are enforced by the ENUM column types)
     __table_args__ = (
-        CheckConstraint("status IN ('pending', 'completed')", name='valid_status'),
-        CheckConstraint("priority IN ('high', 'medium', 'low')", name='valid_priority'),
-        CheckConstraint("section IN ('Backlog', 'To Do', 'In Progress', 'Completed')", name='valid_section'),
-        CheckConstraint("owner IN ('user', 'agent')", name='valid_owner'),
-        Index('idx_kanban_section', 'section'),
-        Index('idx_kanban_status', 'status'),
-        Index('idx_kanban_priority', 'priority'),
+        # One composite for the list_tasks filters; Postgres 18 skip scan uses it
+        # even when the leading columns aren't filtered on
+        Index('idx_kanban_filters', 'status', 'section', 'priority', 'epic'),
         Index('idx_kanban_created_at', 'created_at'),
-        Index('idx_kanban_epic', 'epic'),
-        Index('idx_kanban_position', 'section', 'position'),
+        # Matches the list_tasks ORDER BY so the scan is index-ordered with no sort
+        Index('idx_kanban_list', 'section', 'position', text('created_at DESC')),
+        Index('idx_kanban_section_priority', 'section', 'priority'),
     )
     
     @hybrid_property
     def is_completed(self) -> bool:
         """Check if task is completed."""
-        return self.status == 'completed'
+        return self.status == Status.COMPLETED
     
     @hybrid_property
     def is_high_priority(self) -> bool:
         """Check if task is high priority."""
-        return self.priority == 'high'
-    
-    def to_dict(self) -> dict:
-        """Convert task to dictionary for API responses."""
-        return {
-            'id': self.id,
-            'content': self.content,
-            'status': self.status,
-            'priority': self.priority,
-            'owner': self.owner,
-            'section': self.section,
-            'epic': self.epic,
-            'area': self.area,
-            'occurrence_count': self.occurrence_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'position': self.position,
-            'tags': [tag.name for tag in self.tags]
-        }
+        return self.priority == Priority.HIGH
     
     def __repr__(self):
         return f"<KanbanTask(id={self.id}, content='{self.content[:50]}...', section='{self.section}')>"
@@ -159,7 +185,7 @@ class KanbanTag(Base):
             'id': self.id,
             'name': self.name,
             'color': self.color,
-            'task_count': len(self.tasks)
+            'task_count': self.task_count
         }
     
     def __repr__(self):
@@ -176,6 +202,18 @@ class KanbanTaskTag(Base):
     tag_id = Column(Integer, ForeignKey('kanban_tags.id', ondelete='CASCADE'), primary_key=True)
 
 
+# Number of tasks per tag, counted in SQL from the association table rather than
+# by loading every task. Deferred so tags loaded alongside tasks don't pay for the
+# subquery; use undefer(KanbanTag.task_count) when querying tags for to_dict().
+KanbanTag.task_count = column_property(
+    select(func.count(KanbanTaskTag.task_id))
+    .where(KanbanTaskTag.tag_id == KanbanTag.id)
+    .correlate_except(KanbanTaskTag)
+    .scalar_subquery(),
+    deferred=True
+)
+
+
 # ============================================================================
 # Database Utility Functions
 # ============================================================================
@@ -225,17 +263,17 @@ if __name__ == "__main__":
     # Create a new task
     task = KanbanTask(
         content="Test task from SQLAlchemy",
-        priority="high",
-        section="To Do",
+        priority=Priority.HIGH,
+        section=Section.TODO,
         epic="Testing"
     )
     session.add(task)
     session.commit()
     
     # Query tasks
-    tasks = session.query(KanbanTask).filter_by(section="To Do").all()
+    tasks = session.query(KanbanTask).filter_by(section=Section.TODO).all()
     for task in tasks:
-        print(task.to_dict())
+        print(task)
     
     # Close session
     session.close()
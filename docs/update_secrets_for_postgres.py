@@ -5,17 +5,17 @@ Generates a secure random password for the PostgreSQL database.
 """
 
 import json
+import os
 import secrets
-import string
+import shutil
 from pathlib import Path
 
 
-def generate_secure_password(length=32):
+def generate_secure_password(nbytes=24):
     """Generate a cryptographically secure random password."""
-    # Use letters, digits, and safe special characters
-    chars = string.ascii_letters + string.digits + '!@#$%^&*'
-    password = ''.join(secrets.choice(chars) for _ in range(length))
-    return password
+    # One urandom read, base64url-encoded: 24 bytes -> 32 characters of
+    # letters, digits, '-' and '_' (safe in connection URLs and SQL literals)
+    return secrets.token_urlsafe(nbytes)
 
 
 def update_secrets_file():
@@ -27,12 +27,16 @@ def update_secrets_file():
         print(f"ERROR: {secrets_path} not found!")
         return False
     
+    # Create backup of original file (raw byte copy with metadata, before any changes)
+    backup_path = secrets_path.with_suffix('.json.backup')
+    shutil.copy2(secrets_path, backup_path)
+    print(f"✅ Created backup: {backup_path}")
+    
     # Read existing secrets
-    with open(secrets_path, 'r') as f:
-        secrets_data = json.load(f)
+    secrets_data = json.loads(secrets_path.read_bytes())
     
     # Generate secure password
-    db_password = generate_secure_password(32)
+    db_password = generate_secure_password()
     
     # Create or update databases section
     if 'databases' not in secrets_data:
@@ -47,15 +51,12 @@ def update_secrets_file():
         "database": "hosting_production"
     }
     
-    # Create backup of original file
-    backup_path = secrets_path.with_suffix('.json.backup')
-    with open(backup_path, 'w') as f:
-        json.dump(secrets_data, f, indent=2)
-    print(f"✅ Created backup: {backup_path}")
-    
-    # Write updated secrets
-    with open(secrets_path, 'w') as f:
-        json.dump(secrets_data, f, indent=2)
+    # Write updated secrets to a temp file and rename it into place, so a
+    # crash never leaves a truncated .secrets.json
+    tmp_path = secrets_path.with_suffix('.json.tmp')
+    tmp_path.write_bytes(json.dumps(secrets_data, indent=2).encode())
+    shutil.copymode(secrets_path, tmp_path)
+    os.replace(tmp_path, secrets_path)
     
     print(f"✅ Updated {secrets_path}")
     print(f"\n📋 Database Credentials Added:")
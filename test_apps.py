@@ -22,36 +22,121 @@ Requirements:
     - Local apps running on ports 3001 (cigar), 3002 (tobacco), 3003 (whiskey)
 """
 
+from __future__ import annotations
+
 import argparse
+import hashlib
+import io
 import json
 import os
 import re
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, TextIO, Tuple
+
+# requests and dotenv are imported by load_dependencies() once the arguments
+# are parsed, so `--help` doesn't pay for them
+if TYPE_CHECKING:
+    import requests
+
+try:
+    import orjson as _json  # Faster API response parsing when installed
+except ImportError:
+    _json = json
+
+# App name -> (local port, has JSON API), in test order
+_APP_CONFIG = MappingProxyType({
+    'cigar': (3001, True),
+    'tobacco': (3002, True),
+    'whiskey': (3003, False),
+})
+
+# Number of routes tested concurrently per app
+ROUTE_WORKERS = 16
+
+# Local caches: parsed `rails routes` output (keyed by config/routes.rb
+# mtime and git HEAD), the logged-in session cookies and, briefly, the dev
+# credentials from the hosting API
+CACHE_DIR = Path.home() / '.cache' / 'test_apps'
+# Seconds fetched dev credentials are reused from the cache
+CREDENTIALS_CACHE_TTL = 300
+# Bump when the cached route dict format changes
+ROUTES_CACHE_VERSION = 2
+
+# Patterns used on every response / route line, compiled once
+_H1_RE = re.compile(rb'<h1[^>]*>([^<]+)</h1>')
+_CSRF_RE = re.compile(rb'<meta name="csrf-token" content="([^"]+)"')
+
+# Text that marks a Rails error page, matched in a single pass over the raw
+# response bytes (the indicators are ASCII, so no decode is needed)
+_ERROR_INDICATORS = (
+    "We're sorry, but something went wrong",
+    "ActionController::RoutingError",
+    "NoMethodError",
+    "undefined method",
+    "ActiveRecord::RecordNotFound",
+    "Couldn't find",
+    "uninitialized constant"
+)
+_ERROR_INDICATORS_RE = re.compile(b'|'.join(re.escape(indicator.encode()) for indicator in _ERROR_INDICATORS))
+
+# `rails routes` lines are whitespace-separated columns ending in
+# VERB  /path(.:format)  controller#action
+_ROUTE_VERBS = frozenset(('GET', 'POST', 'PATCH', 'PUT', 'DELETE'))
+_FORMAT_SUFFIX = '(.:format)'
+
+# Route paths that aren't tested: auth/asset/API paths
+_SKIP_ROUTE_PATTERNS = (
+    'sign_in', 'sign_out', 'sign_up', 'password',
+    'rails/', 'service-worker', 'manifest', '/api/'
+)
+_SKIP_ROUTE_RE = re.compile('|'.join(re.escape(pattern) for pattern in _SKIP_ROUTE_PATTERNS))
 
-import requests
-from dotenv import load_dotenv
+# `resources :cigars, only: [:index, :show]` lines in config/routes.rb
+_RESOURCES_RE = re.compile(r'^([ \t]*)resources\s+:(\w+)(.*)$', re.MULTILINE)
+
+
+def _is_testable_route(verb: str, path: str) -> bool:
+    """Whether a route can be probed with a plain GET"""
+    # Cheapest checks first: only GET routes, and skip routes with ANY
+    # parameter placeholder (:id, :cigar_id, :token, etc) since we don't
+    # know valid IDs -- that's most show/edit/nested routes
+    if verb != 'GET' or ':' in path:
+        return False
+    return not _SKIP_ROUTE_RE.search(path)
+
+# ANSI colors for output, disabled when stdout isn't a terminal (CI logs, pipes)
+_USE_COLOR = sys.stdout.isatty()
+
+
+def _c(code: str) -> str:
+    return code if _USE_COLOR else ''
 
-# Load environment variables from .env
-load_dotenv()
 
-# ANSI colors for output
 class Colors:
-    GREEN = '\033[0;32m'
-    RED = '\033[0;31m'
-    YELLOW = '\033[1;33m'
-    BLUE = '\033[0;34m'
-    CYAN = '\033[0;36m'
-    MAGENTA = '\033[0;35m'
-    NC = '\033[0m'  # No Color
-    BOLD = '\033[1m'
+    GREEN = _c('\033[0;32m')
+    RED = _c('\033[0;31m')
+    YELLOW = _c('\033[1;33m')
+    BLUE = _c('\033[0;34m')
+    CYAN = _c('\033[0;36m')
+    MAGENTA = _c('\033[0;35m')
+    NC = _c('\033[0m')  # No Color
+    BOLD = _c('\033[1m')
 
 
-@dataclass
-class AppConfig:
+# Result labels, formatted once
+PASS_LABEL = f"{Colors.GREEN}✅ PASS{Colors.NC}"
+FAIL_LABEL = f"{Colors.RED}❌ FAIL{Colors.NC}"
+
+
+class AppConfig(NamedTuple):
     """Configuration for a Rails application"""
     name: str
     port: int
@@ -61,9 +146,8 @@ class AppConfig:
     has_api: bool = False  # Whether app has JSON API
 
 
-@dataclass
-class TestResult:
-    """Result of a single test"""
+class TestResult(NamedTuple):
+    """Result of a single test (a NamedTuple: no per-instance __dict__)"""
     category: str  # e.g., "Health", "Auth", "Routes", "API"
     name: str
     passed: bool
@@ -96,6 +180,16 @@ class HostingAPIClient:
         self.api_token = api_token
         self.base_url = base_url
         self.session = requests.Session()
+        # Keep-alive pool sized for concurrent credential fetches, retrying
+        # GETs on transient gateway errors instead of failing the whole run
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False  # Hand back the last response once retries run out
+        )
+        self.session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=20, max_retries=retries))
         self.session.headers.update({
             'Authorization': f'Bearer {api_token}',
             'Content-Type': 'application/json'
@@ -117,7 +211,7 @@ class HostingAPIClient:
             response = self.session.get(url, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = _json.loads(response.content)
                 email = data.get(f'dev_{app_name}_email')
                 password = data.get(f'dev_{app_name}_password')
                 return email, password
@@ -127,32 +221,175 @@ class HostingAPIClient:
         except Exception as e:
             print(f"{Colors.RED}Failed to fetch credentials: {e}{Colors.NC}")
             return None, None
+    
+    def get_user_credentials_batch(self, username: str, app_names: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Get dev credentials for several apps, from a short-lived local cache
+        when possible, so quick re-runs skip the round-trip to the hosting API.
+        
+        Returns:
+            Dict of app_name -> (email, password), (None, None) if not found
+        """
+        cache_file = CACHE_DIR / f"credentials-{username}.json"
+        # Entries are [email, password, fetched_at]; each expires on its own
+        # so rewriting the file for one app never renews the others
+        now = time.time()
+        cached = {}
+        try:
+            for app_name, (email, password, fetched_at) in json.loads(cache_file.read_text()).items():
+                if now - fetched_at < CREDENTIALS_CACHE_TTL:
+                    cached[app_name] = (email, password, fetched_at)
+        except (OSError, ValueError, TypeError, AttributeError):
+            cached = {}
+        
+        credentials = {app_name: (email, password) for app_name, (email, password, _) in cached.items()}
+        missing = [app_name for app_name in app_names if app_name not in credentials]
+        if missing:
+            fetched = self.fetch_user_credentials_batch(username, missing)
+            found = {app_name: (*creds, now) for app_name, creds in fetched.items() if all(creds)}
+            if found:
+                cached.update(found)
+                self.save_credentials_cache(cache_file, cached)
+            credentials.update(fetched)
+        
+        return {app_name: credentials[app_name] for app_name in app_names}
+    
+    def save_credentials_cache(self, cache_file: Path, credentials: Dict[str, Tuple[str, str, float]]):
+        """Write the credentials cache (fresh entries only) with owner-only permissions"""
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(credentials, f)
+        except OSError:
+            pass
+    
+    def fetch_user_credentials_batch(self, username: str, app_names: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Fetch dev credentials for several apps in one API call.
+        
+        Requests /api/v1/credentials/{username}?apps=cigar,tobacco,... which
+        returns the dev_{app}_email / dev_{app}_password keys for every app.
+        Apps the response has no credentials for (including when the server
+        doesn't support the batch form) fall back to concurrent per-app
+        get_user_credentials calls.
+        
+        Returns:
+            Dict of app_name -> (email, password), (None, None) if not found
+        """
+        credentials = {}
+        try:
+            url = f"{self.base_url}/api/v1/credentials/{username}"
+            response = self.session.get(url, params={'apps': ','.join(app_names)}, timeout=10)
+            
+            if response.status_code == 200:
+                data = _json.loads(response.content)
+                for app_name in app_names:
+                    email = data.get(f'dev_{app_name}_email')
+                    password = data.get(f'dev_{app_name}_password')
+                    if email and password:
+                        credentials[app_name] = (email, password)
+        except Exception:
+            pass
+        
+        missing = [app_name for app_name in app_names if app_name not in credentials]
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                fetched = executor.map(lambda app_name: self.get_user_credentials(username, app_name), missing)
+                credentials.update(zip(missing, fetched))
+        
+        return {app_name: credentials[app_name] for app_name in app_names}
 
 
 class RailsAppTester:
     """Comprehensive tester for Rails management applications"""
     
-    def __init__(self, app_config: AppConfig, workspace_root: Path):
+    def __init__(self, app_config: AppConfig, workspace_root: Path, out: Optional[TextIO] = None):
         self.app = app_config
+        self.out = out or sys.stdout  # Where progress and results are printed
         self.workspace_root = workspace_root
         self.app_root = workspace_root / f"{app_config.name}-management-system"
-        self.session = requests.Session()
+        self.session = self.new_session()
+        # Separate keep-alive session for unauthenticated probes
+        self.probe_session = self.new_session()
         self.csrf_token = None
         self.summary = TestSummary(app_name=app_config.name)
+        # Per-thread sessions for concurrent route tests
+        self._local = threading.local()
+        self._thread_sessions = []
+        self._thread_sessions_lock = threading.Lock()
+    
+    def set_credentials(self, email: str, password: str):
+        """Set the login credentials (fetched after the tester is created)"""
+        self.app = self.app._replace(email=email, password=password)
+    
+    def warm_up(self):
+        """Open keep-alive connections to the app ahead of the first tests"""
+        for session in (self.probe_session, self.session):
+            try:
+                session.head(self.app.base_url, timeout=5)
+            except requests.RequestException:
+                pass
+    
+    @staticmethod
+    def new_session() -> requests.Session:
+        """
+        Create a session with an explicitly sized keep-alive pool for the app.
+        
+        Connection errors and gateway errors (502/503/504, e.g. from a
+        restarting server) are retried; Rails errors (500) are not, they are
+        what the tests look for. POSTs aren't retried on a gateway error, so the
+        Devise sign-in is never submitted twice.
+        """
+        retries = Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False  # Report the last 5xx as a failed test, not a RetryError
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retries)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def thread_session(self) -> requests.Session:
+        """
+        Get this thread's session, a copy of the authenticated session.
+        
+        requests.Session is not safe to share between threads (responses
+        update its cookie jar), so each route worker gets its own.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.new_session()
+            session.cookies.update(self.session.cookies)
+            self._local.session = session
+            with self._thread_sessions_lock:
+                self._thread_sessions.append(session)
+        return session
+    
+    @staticmethod
+    def format_test_result(result: TestResult) -> List[str]:
+        """Format a test result as output lines"""
+        if result.passed:
+            return [f"  {PASS_LABEL}: {result.name}"]
+        lines = [
+            f"  {FAIL_LABEL}: {result.name}",
+            f"    {Colors.RED}└─ {result.message}{Colors.NC}",
+        ]
+        if result.error_details:
+            # Print first 200 chars of error details
+            error_preview = result.error_details[:200]
+            if len(result.error_details) > 200:
+                error_preview += "..."
+            lines.append(f"    {Colors.YELLOW}   Error: {error_preview}{Colors.NC}")
+        return lines
     
     def print_test_result(self, result: TestResult):
         """Print a test result with appropriate formatting"""
-        if result.passed:
-            print(f"  {Colors.GREEN}✅ PASS{Colors.NC}: {result.name}")
-        else:
-            print(f"  {Colors.RED}❌ FAIL{Colors.NC}: {result.name}")
-            print(f"    {Colors.RED}└─ {result.message}{Colors.NC}")
-            if result.error_details:
-                # Print first 200 chars of error details
-                error_preview = result.error_details[:200]
-                if len(result.error_details) > 200:
-                    error_preview += "..."
-                print(f"    {Colors.YELLOW}   Error: {error_preview}{Colors.NC}")
+        self.out.write('\n'.join(self.format_test_result(result)) + '\n')
     
     def check_for_rails_error(self, response: requests.Response) -> Tuple[bool, Optional[str]]:
         """
@@ -164,73 +401,218 @@ class RailsAppTester:
         if response.status_code >= 500:
             return True, f"HTTP {response.status_code} Server Error"
         
-        # Check for Rails error indicators in HTML
-        error_indicators = [
-            "We're sorry, but something went wrong",
-            "ActionController::RoutingError",
-            "NoMethodError",
-            "undefined method",
-            "ActiveRecord::RecordNotFound",
-            "Couldn't find",
-            "uninitialized constant"
-        ]
+        # Rails error pages are HTML; a successful JSON/asset response
+        # can't be one, so don't scan its body
+        if response.status_code < 400 and 'html' not in response.headers.get('Content-Type', ''):
+            return False, None
         
-        for indicator in error_indicators:
-            if indicator in response.text:
-                # Try to extract error message
-                match = re.search(r'<h1[^>]*>([^<]+)</h1>', response.text)
-                if match:
-                    return True, match.group(1)
-                return True, indicator
+        # Check for Rails error indicators in HTML
+        body = response.content
+        indicator_match = _ERROR_INDICATORS_RE.search(body)
+        if not indicator_match:
+            return False, None
         
-        return False, None
+        # Try to extract error message, decoding only the heading
+        match = _H1_RE.search(body)
+        if match:
+            return True, match.group(1).decode(response.encoding or 'utf-8', errors='replace')
+        return True, indicator_match.group(0).decode()
     
     def get_routes(self) -> List[Dict[str, str]]:
         """
-        Dynamically read routes from the Rails app using `rails routes`.
+        Get the app's routes, from the on-disk cache if they can't have changed.
+        
+        Booting Rails for `rails routes` takes seconds, and the routes only
+        change with config/routes.rb or the checked-out commit (engines,
+        gems, drawn route files).
         
         Returns:
             List of route dictionaries with verb, path, controller#action
+            and whether the route is testable
+        """
+        cache_file = CACHE_DIR / f"{self.app.name}-routes.json"
+        try:
+            mtime = (self.app_root / 'config' / 'routes.rb').stat().st_mtime_ns
+        except OSError:
+            return self.read_rails_routes()
+        key = [ROUTES_CACHE_VERSION, mtime, self.git_head()]
+        
+        try:
+            cached = json.loads(cache_file.read_text())
+            if cached['key'] == key:
+                return cached['routes']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        
+        routes = self.read_rails_routes()
+        if routes:
+            self.save_routes_cache(cache_file, key, routes)
+            return routes
+        return self.scan_routes_rb()
+    
+    def scan_routes_rb(self) -> List[Dict[str, str]]:
+        """
+        Approximate the index routes from `resources` lines in config/routes.rb.
+        
+        Used when `rails routes` can't run (no bundle, Rails fails to boot).
+        Only the least-indented `resources` lines are used: deeper ones sit
+        inside a namespace/scope or are nested, and their paths can't be
+        known without Rails. The result is not cached.
         """
+        try:
+            text = (self.app_root / 'config' / 'routes.rb').read_text()
+        except OSError:
+            return []
+        
+        matches = _RESOURCES_RE.findall(text)
+        if not matches:
+            return []
+        print(f"{Colors.YELLOW}  Falling back to the resources in config/routes.rb{Colors.NC}", file=self.out)
+        top_level = min(len(indent) for indent, _, _ in matches)
+        routes = []
+        for indent, name, options in matches:
+            if len(indent) != top_level:
+                continue
+            if 'only:' in options and 'index' not in options:
+                continue
+            if 'except:' in options and 'index' in options:
+                continue
+            path = f"/{name}"
+            routes.append({
+                'verb': 'GET',
+                'path': path,
+                'action': f"{name}#index",
+                'testable': _is_testable_route('GET', path)
+            })
+        return routes
+    
+    def git_head(self) -> Optional[str]:
+        """Commit checked out in the app repo, or None if it isn't a git checkout"""
         try:
             result = subprocess.run(
-                ["bundle", "exec", "rails", "routes"],
-                cwd=self.app_root,
+                ['git', '-C', str(self.app_root), 'rev-parse', 'HEAD'],
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=5
             )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+    
+    def save_routes_cache(self, cache_file: Path, key: list, routes: List[Dict[str, str]]):
+        """Write the routes cache atomically (temp file + rename) so readers never see a partial file"""
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'key': key, 'routes': routes}, f)
+            os.replace(tmp_path, cache_file)
+        except OSError as e:
+            print(f"{Colors.YELLOW}  Warning: Could not cache routes: {e}{Colors.NC}", file=self.out)
+    
+    def read_rails_routes(self) -> List[Dict[str, str]]:
+        """
+        Dynamically read routes from the Rails app using `rails routes`.
+        
+        Returns:
+            List of route dictionaries with verb, path, controller#action
+            and whether the route is testable
+        """
+        try:
+            # Stream stdout and parse each line as Rails prints it, rather than
+            # buffering the whole output first
+            with subprocess.Popen(
+                ["bundle", "exec", "rails", "routes"],
+                cwd=self.app_root,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True
+            ) as process:
+                watchdog = threading.Timer(30, process.kill)
+                watchdog.start()
+                try:
+                    # Parse route lines like:
+                    # Prefix Verb   URI Pattern                      Controller#Action
+                    # cigars GET    /cigars(.:format)                cigars#index
+                    routes = []
+                    for line in process.stdout:
+                        # Header and engine lines don't end in VERB PATH ACTION
+                        parts = line.split()
+                        if len(parts) >= 3 and parts[-3] in _ROUTE_VERBS:
+                            verb, path, action = parts[-3:]
+                            if path.endswith(_FORMAT_SUFFIX):
+                                path = path[:-len(_FORMAT_SUFFIX)]
+                            routes.append({
+                                'verb': verb,
+                                'path': path,
+                                'action': action,
+                                'testable': _is_testable_route(verb, path)
+                            })
+                    returncode = process.wait()
+                finally:
+                    watchdog.cancel()
             
-            if result.returncode != 0:
-                print(f"{Colors.YELLOW}  Warning: Could not read routes for {self.app.name}{Colors.NC}")
+            if returncode != 0:
+                print(f"{Colors.YELLOW}  Warning: Could not read routes for {self.app.name}{Colors.NC}", file=self.out)
                 return []
             
-            routes = []
-            for line in result.stdout.split('\n'):
-                # Parse route lines like: 
-                # Prefix Verb   URI Pattern                      Controller#Action
-                # cigars GET    /cigars(.:format)                cigars#index
-                # Skip lines that contain "Prefix" or "Verb" (headers)
-                if 'Prefix' in line or 'Verb' in line or 'URI Pattern' in line:
-                    continue
-                
-                # Match: optional_prefix  VERB  /path(.:format)  controller#action
-                match = re.search(r'\b(GET|POST|PATCH|PUT|DELETE)\s+(\S+)\s+(\S+)$', line)
-                if match:
-                    verb, path, action = match.groups()
-                    # Clean up path (remove format suffix)
-                    path = re.sub(r'\(\.:format\)', '', path)
-                    routes.append({
-                        'verb': verb,
-                        'path': path,
-                        'action': action
-                    })
-            
             return routes
         except Exception as e:
-            print(f"{Colors.RED}  Error reading routes: {e}{Colors.NC}")
+            print(f"{Colors.RED}  Error reading routes: {e}{Colors.NC}", file=self.out)
             return []
     
+    def cookie_cache_file(self) -> Path:
+        """Cookie cache path for this app and login email"""
+        email_hash = hashlib.sha256(self.app.email.encode()).hexdigest()[:16]
+        return CACHE_DIR / f"{self.app.name}-{email_hash}-cookies.json"
+    
+    def restore_session(self) -> bool:
+        """
+        Reuse the cookies saved by an earlier successful login, if still valid.
+        
+        Returns:
+            True if the restored session is authenticated, False otherwise
+        """
+        if not self.app.email:
+            return False
+        
+        try:
+            for fields in json.loads(self.cookie_cache_file().read_text()):
+                self.session.cookies.set_cookie(requests.cookies.create_cookie(**fields))
+            
+            # One cheap probe: an expired session redirects to the sign-in page
+            response = self.session.head(f"{self.app.base_url}/", allow_redirects=True, timeout=10)
+            if response.status_code == 200 and 'sign_in' not in response.url:
+                return True
+        except Exception:
+            pass
+        
+        self.session.cookies.clear()
+        return False
+    
+    def save_session(self):
+        """Save the logged-in session cookies (owner-only permissions) for the next run"""
+        try:
+            cache_file = self.cookie_cache_file()
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            # Plain cookie fields as JSON; loading a pickle off disk could run code
+            cookies = [
+                {
+                    'name': cookie.name,
+                    'value': cookie.value,
+                    'domain': cookie.domain,
+                    'path': cookie.path,
+                    'expires': cookie.expires,
+                    'secure': cookie.secure
+                }
+                for cookie in self.session.cookies
+            ]
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cookies, f)
+        except OSError as e:
+            print(f"{Colors.YELLOW}  Warning: Could not cache session cookies: {e}{Colors.NC}", file=self.out)
+    
     def login(self) -> bool:
         """
         Authenticate with the Rails app using Devise.
@@ -245,16 +627,14 @@ class RailsAppTester:
             # Step 1: GET login page to retrieve CSRF token
             login_url = f"{self.app.base_url}/users/sign_in"
             response = self.session.get(login_url, timeout=10)
-            
             if response.status_code != 200:
                 return False
             
             # Extract CSRF token from meta tag
-            csrf_match = re.search(r'<meta name="csrf-token" content="([^"]+)"', response.text)
-            if csrf_match:
-                self.csrf_token = csrf_match.group(1)
-            else:
+            csrf_match = _CSRF_RE.search(response.content)
+            if not csrf_match:
                 return False
+            self.csrf_token = csrf_match.group(1).decode()
             
             # Step 2: POST credentials
             post_data = {
@@ -271,21 +651,23 @@ class RailsAppTester:
                 timeout=10
             )
             
-            # Check if login was successful
-            if 'user' in response.cookies or response.status_code == 200:
+            # Check if login was successful (status first: it's the common
+            # case and avoids scanning the cookie jar)
+            if response.status_code == 200 or response.cookies.get('user') is not None:
                 # Additional check: make sure we're not still on login page
                 if 'sign_in' not in response.url:
+                    self.save_session()
                     return True
             
             return False
         except Exception as e:
-            print(f"{Colors.RED}  Login error: {e}{Colors.NC}")
+            print(f"{Colors.RED}  Login error: {e}{Colors.NC}", file=self.out)
             return False
     
     def test_health_check(self) -> TestResult:
         """Test the /up health endpoint"""
         try:
-            response = requests.get(f"{self.app.base_url}/up", timeout=10)
+            response = self.probe_session.get(f"{self.app.base_url}/up", timeout=10)
             if response.status_code == 200:
                 return TestResult(
                     category="Health",
@@ -313,10 +695,11 @@ class RailsAppTester:
     def test_login_page(self) -> TestResult:
         """Test that login page is accessible"""
         try:
-            response = requests.get(f"{self.app.base_url}/users/sign_in", timeout=10)
+            response = self.probe_session.get(f"{self.app.base_url}/users/sign_in", timeout=10)
             if response.status_code == 200:
                 # Check for expected content
-                if 'email' in response.text.lower() and 'password' in response.text.lower():
+                page = response.content.lower()
+                if b'email' in page and b'password' in page:
                     return TestResult(
                         category="Auth",
                         name="Login page accessible",
@@ -395,7 +778,15 @@ class RailsAppTester:
         action = route['action']
         
         try:
-            response = self.session.get(f"{self.app.base_url}{path}", timeout=10)
+            url = f"{self.app.base_url}{path}"
+            session = self.thread_session()
+            # HEAD first: Rails renders the whole action for HEAD too, so a
+            # 2xx/3xx answer is trusted as is, and exceptions already show up
+            # as a 5xx status. Only a 4xx (including servers that reject HEAD)
+            # is repeated as a GET, for its body to be scanned.
+            response = session.head(url, timeout=10, allow_redirects=True)
+            if 400 <= response.status_code < 500:
+                response = session.get(url, timeout=10)
             
             # Check for Rails errors
             is_error, error_msg = self.check_for_rails_error(response)
@@ -458,7 +849,7 @@ class RailsAppTester:
             # API might return 404 for invalid token, but should be JSON
             if response.status_code in [200, 404, 401]:
                 try:
-                    data = response.json()
+                    data = _json.loads(response.content)
                     if isinstance(data, (dict, list)):
                         return TestResult(
                             category="API",
@@ -498,89 +889,101 @@ class RailsAppTester:
         Returns:
             TestSummary with all results
         """
-        print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.NC}")
-        print(f"{Colors.BOLD}{Colors.BLUE}Testing {self.app.name.title()} Management App (Port {self.app.port}){Colors.NC}")
-        print(f"{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.NC}\n")
+        print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.NC}", file=self.out)
+        print(f"{Colors.BOLD}{Colors.BLUE}Testing {self.app.name.title()} Management App (Port {self.app.port}){Colors.NC}", file=self.out)
+        print(f"{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.NC}\n", file=self.out)
         
         # Category 1: Health Checks
-        print(f"{Colors.CYAN}[1/5] Health Checks{Colors.NC}")
+        print(f"{Colors.CYAN}[1/5] Health Checks{Colors.NC}", file=self.out)
         result = self.test_health_check()
         self.print_test_result(result)
         self.summary.add_result(result)
         
         # Category 2: Authentication
-        print(f"\n{Colors.CYAN}[2/5] Authentication{Colors.NC}")
+        print(f"\n{Colors.CYAN}[2/5] Authentication{Colors.NC}", file=self.out)
         result = self.test_login_page()
         self.print_test_result(result)
         self.summary.add_result(result)
         
         # Attempt login
-        print(f"  {Colors.YELLOW}Attempting authentication...{Colors.NC}")
-        if self.login():
-            print(f"  {Colors.GREEN}✅ Authentication successful{Colors.NC}")
+        print(f"  {Colors.YELLOW}Attempting authentication...{Colors.NC}", file=self.out)
+        if self.restore_session():
+            print(f"  {Colors.GREEN}✅ Authentication successful (saved session){Colors.NC}", file=self.out)
+        elif self.login():
+            print(f"  {Colors.GREEN}✅ Authentication successful{Colors.NC}", file=self.out)
         else:
-            print(f"  {Colors.RED}❌ Authentication failed - skipping authenticated tests{Colors.NC}")
+            print(f"  {Colors.RED}❌ Authentication failed - skipping authenticated tests{Colors.NC}", file=self.out)
             return self.summary
         
         # Category 3: Dashboard
-        print(f"\n{Colors.CYAN}[3/5] Dashboard{Colors.NC}")
+        print(f"\n{Colors.CYAN}[3/5] Dashboard{Colors.NC}", file=self.out)
         result = self.test_dashboard()
         self.print_test_result(result)
         self.summary.add_result(result)
         
         # Category 4: Routes (Controllers)
-        print(f"\n{Colors.CYAN}[4/5] Controller Routes{Colors.NC}")
-        print(f"  {Colors.YELLOW}Reading routes from Rails...{Colors.NC}")
+        print(f"\n{Colors.CYAN}[4/5] Controller Routes{Colors.NC}", file=self.out)
+        print(f"  {Colors.YELLOW}Reading routes from Rails...{Colors.NC}", file=self.out)
         routes = self.get_routes()
         
         # Filter to testable routes
-        testable_routes = []
-        for route in routes:
-            path = route['path']
-            verb = route['verb']
-            
-            # Only test GET routes
-            if verb != 'GET':
-                continue
-            
-            # Skip certain paths
-            skip_patterns = [
-                'sign_in', 'sign_out', 'sign_up', 'password',
-                'rails/', 'service-worker', 'manifest', '/api/'
-            ]
-            if any(pattern in path for pattern in skip_patterns):
-                continue
-            
-            # Skip routes with ANY parameter placeholders (:id, :cigar_id, :token, etc)
-            # We can't test these without knowing actual valid IDs
-            if ':' in path:
-                continue
-            
-            testable_routes.append(route)
+        testable_routes = [route for route in routes if route['testable']]
         
-        print(f"  {Colors.YELLOW}Found {len(testable_routes)} testable routes{Colors.NC}")
+        print(f"  {Colors.YELLOW}Found {len(testable_routes)} testable routes{Colors.NC}", file=self.out)
         
-        for route in testable_routes:
-            result = self.test_route(route)
-            self.print_test_result(result)
-            self.summary.add_result(result)
+        # Routes are independent, so test them concurrently; results come
+        # back in route order and are written out in one go
+        lines = []
+        with ThreadPoolExecutor(max_workers=ROUTE_WORKERS) as executor:
+            for result in executor.map(self.test_route, testable_routes):
+                lines.extend(self.format_test_result(result))
+                self.summary.add_result(result)
+        if lines:
+            self.out.write('\n'.join(lines) + '\n')
+            self.out.flush()
+        for session in self._thread_sessions:
+            session.close()
         
         # Category 5: API Endpoints
         if self.app.has_api:
-            print(f"\n{Colors.CYAN}[5/5] API Endpoints{Colors.NC}")
+            print(f"\n{Colors.CYAN}[5/5] API Endpoints{Colors.NC}", file=self.out)
             result = self.test_api_endpoint()
             if result:
                 self.print_test_result(result)
                 self.summary.add_result(result)
         else:
-            print(f"\n{Colors.CYAN}[5/5] API Endpoints{Colors.NC}")
-            print(f"  {Colors.YELLOW}⊘ No API endpoints for this app{Colors.NC}")
+            print(f"\n{Colors.CYAN}[5/5] API Endpoints{Colors.NC}", file=self.out)
+            print(f"  {Colors.YELLOW}⊘ No API endpoints for this app{Colors.NC}", file=self.out)
         
         return self.summary
 
 
+def load_dependencies():
+    """Import the HTTP libraries and load environment variables from .env"""
+    global requests, HTTPAdapter, Retry
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+
+
 def get_system_username() -> str:
-    """Get the current system username using whoami"""
+    """Get the current system username (same value as whoami, without spawning it)"""
+    # whoami reports the effective user; $USER/$LOGNAME can be stale after
+    # su, under sudo -E, in containers or from cron
+    try:
+        import pwd  # Unix only
+        return pwd.getpwuid(os.geteuid()).pw_name
+    except (ImportError, KeyError):
+        pass
+    
+    username = os.environ.get('USER') or os.environ.get('LOGNAME')
+    if username:
+        return username
+    
+    # Last resort (e.g. Windows)
     try:
         result = subprocess.run(['whoami'], capture_output=True, text=True, timeout=5)
         return result.stdout.strip()
@@ -639,11 +1042,12 @@ Examples:
     )
     parser.add_argument(
         '--app',
-        choices=['cigar', 'tobacco', 'whiskey'],
+        choices=list(_APP_CONFIG),
         help='Test a specific application'
     )
     
     args = parser.parse_args()
+    load_dependencies()
     
     # Get API token from environment
     api_token = os.getenv('HOSTING_API_TOKEN')
@@ -664,40 +1068,58 @@ Examples:
     if args.app:
         app_names = [args.app]
     else:
-        app_names = ['cigar', 'tobacco', 'whiskey']
+        app_names = list(_APP_CONFIG)
     
     workspace_root = Path(__file__).parent
     
-    # Fetch credentials and create app configs
-    apps_to_test = []
+    # Create a tester per app. With several apps, each buffers its output so
+    # the concurrent reports can be printed in app order.
+    buffered = len(app_names) > 1
+    testers = []
     for app_name in app_names:
-        port = {'cigar': 3001, 'tobacco': 3002, 'whiskey': 3003}[app_name]
-        has_api = app_name in ['cigar', 'tobacco']  # These apps have API endpoints
-        
-        print(f"{Colors.YELLOW}Fetching credentials for {app_name}...{Colors.NC}")
-        email, password = api_client.get_user_credentials(username, app_name)
-        
-        if not email or not password:
-            print(f"{Colors.YELLOW}Warning: Could not fetch credentials for {app_name}, using defaults{Colors.NC}")
-            email = f"admin@{app_name}.com"
-            password = "password123"
-        
+        port, has_api = _APP_CONFIG[app_name]
         app_config = AppConfig(
             name=app_name,
             port=port,
             base_url=f"http://localhost:{port}",
-            email=email,
-            password=password,
             has_api=has_api
         )
-        apps_to_test.append(app_config)
+        testers.append(RailsAppTester(app_config, workspace_root, out=io.StringIO() if buffered else None))
+    
+    # Fetch credentials for all apps in one request, opening each app's
+    # connections in the meantime so the first tests don't wait on them
+    print(f"{Colors.YELLOW}Fetching credentials for {', '.join(app_names)}...{Colors.NC}")
+    with ThreadPoolExecutor(max_workers=len(testers)) as executor:
+        for tester in testers:
+            executor.submit(tester.warm_up)
+        credentials = api_client.get_user_credentials_batch(username, app_names)
     
-    # Run tests for each app
+    for tester in testers:
+        app_name = tester.app.name
+        email, password = credentials[app_name]
+        
+        if not email or not password:
+            print(f"{Colors.YELLOW}Warning: Could not fetch credentials for {app_name}, using defaults{Colors.NC}")
+            email = f"admin@{app_name}.com"
+            password = "password123"
+        
+        tester.set_credentials(email, password)
+    
+    # Run tests for each app. The apps are independent servers, so test them
+    # concurrently and print each app's buffered report in app order so the
+    # reports don't interleave.
     summaries = []
-    for app_config in apps_to_test:
-        tester = RailsAppTester(app_config, workspace_root)
-        summary = tester.run_tests()
-        summaries.append(summary)
+    if not buffered:
+        summaries.append(testers[0].run_tests())
+    else:
+        def run_app_tests(tester: RailsAppTester) -> Tuple[TestSummary, str]:
+            summary = tester.run_tests()
+            return summary, tester.out.getvalue()
+        
+        with ThreadPoolExecutor(max_workers=len(testers)) as executor:
+            for summary, output in executor.map(run_app_tests, testers):
+                sys.stdout.write(output)
+                summaries.append(summary)
     
     # Print final summary
     print_final_summary(summaries)